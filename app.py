@@ -1,24 +1,26 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from collections import Counter
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-import os
+import io
 import numpy as np
-import matplotlib.font_manager as fm
+import pyarrow as pa
 
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
+# 情感类型对应的颜色
+SENTIMENT_COLORS = {'积极': '#2E8B57', '消极': '#DC143C', '中性': '#1E90FF'}
+
+# 趋势图最多绘制的时间点数，超过后按周汇总
+MAX_TREND_POINTS = 2000
+
+# 按上传文件缓存的数据最多保留的文件数和保留时间（秒），避免每次上传都常驻内存
+MAX_CACHED_FILES = 4
+CACHE_TTL = 3600
 
 
 def create_advanced_bar_chart(word_freq, title="高频词汇云图"):
     """创建高级条形图"""
+    import plotly.graph_objects as go
+
     try:
-        top_words = word_freq.most_common(30)
+        top_words = list(word_freq.head(30).items())
 
         if not top_words:
             return None
@@ -65,8 +67,10 @@ def create_advanced_bar_chart(word_freq, title="高频词汇云图"):
 
 def create_word_importance_chart(word_freq, title="词汇重要性分布"):
     """创建词汇重要性图表 - 修复版本"""
+    import plotly.graph_objects as go
+
     try:
-        top_words = word_freq.most_common(25)
+        top_words = list(word_freq.head(25).items())
 
         if not top_words:
             return None
@@ -126,8 +130,10 @@ def create_word_importance_chart(word_freq, title="词汇重要性分布"):
 
 def create_word_frequency_heatmap(word_freq, title="词汇频率热力图"):
     """创建词汇频率热力图"""
+    import plotly.graph_objects as go
+
     try:
-        top_words = word_freq.most_common(20)
+        top_words = list(word_freq.head(20).items())
 
         if not top_words:
             return None
@@ -173,8 +179,10 @@ def create_word_frequency_heatmap(word_freq, title="词汇频率热力图"):
 
 def create_word_network_chart(word_freq, title="词汇网络图"):
     """创建词汇网络图"""
+    import plotly.graph_objects as go
+
     try:
-        top_words = word_freq.most_common(15)
+        top_words = list(word_freq.head(15).items())
 
         if not top_words:
             return None
@@ -225,34 +233,261 @@ def create_word_network_chart(word_freq, title="词汇网络图"):
         return None
 
 
-def get_words_from_segmented(segmented_str):
-    """从分词字符串中提取词汇"""
-    if pd.isna(segmented_str) or not isinstance(segmented_str, str):
-        return []
+@st.cache_data(show_spinner=False)
+def create_word_chart(viz_option, word_freq, sentiment_option):
+    """按所选方案生成词汇图表（相同词频和选项直接复用已生成的图表）"""
+    title_suffix = f"{sentiment_option} - "
+
+    if viz_option == "高级条形图":
+        return create_advanced_bar_chart(
+            word_freq,
+            title=title_suffix + '高频词汇图'
+        )
+
+    elif viz_option == "词汇重要性图":
+        return create_word_importance_chart(
+            word_freq,
+            title=title_suffix + '词汇重要性分布'
+        )
+
+    elif viz_option == "频率热力图":
+        return create_word_frequency_heatmap(
+            word_freq,
+            title=title_suffix + '词汇频率热力图'
+        )
+
+    elif viz_option == "网络图":
+        return create_word_network_chart(
+            word_freq,
+            title=title_suffix + '词汇网络图'
+        )
 
+    return None
+
+
+@st.cache_data(show_spinner=False)
+def create_sentiment_pie_chart(sentiment_counts):
+    """创建情感分布饼图"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Pie(
+        labels=sentiment_counts.index,
+        values=sentiment_counts.values,
+        marker=dict(colors=[SENTIMENT_COLORS.get(label) for label in sentiment_counts.index])
+    ))
+    fig.update_layout(title='评论情感分布')
+    return fig
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES, ttl=CACHE_TTL)
+def create_score_histogram(file_key, _scores):
+    """创建情感得分分布直方图（分箱在服务端完成，只向浏览器发送20个柱子）"""
+    import plotly.graph_objects as go
+
+    counts, edges = np.histogram(_scores.dropna().to_numpy(), bins=20)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        marker_color='#636EFA'
+    ))
+    fig.add_vline(x=0.5, line_dash="dash", line_color="red")
+    fig.update_layout(
+        title='情感得分分布',
+        xaxis_title='sentiment_score',
+        yaxis_title='count',
+        bargap=0
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def create_trend_charts(trend_stats, period_label="每日"):
+    """创建情感得分趋势图和评论数量图"""
+    import plotly.graph_objects as go
+
+    # 折线使用 WebGL 渲染，时间点较多时浏览器端绘制更快
+    fig_trend = go.Figure(go.Scattergl(
+        x=trend_stats['post_day'],
+        y=trend_stats['sentiment_score'],
+        mode='lines'
+    ))
+    fig_trend.update_layout(
+        title=f'{period_label}平均情感得分趋势',
+        xaxis_title='日期',
+        yaxis_title='平均情感得分'
+    )
+
+    fig_count = go.Figure(go.Bar(
+        x=trend_stats['post_day'],
+        y=trend_stats['comment_id']
+    ))
+    fig_count.update_layout(
+        title=f'{period_label}评论数量',
+        xaxis_title='日期',
+        yaxis_title='评论数量'
+    )
+
+    return fig_trend, fig_count
+
+
+def split_segmented_words(segmented_series):
+    """向量化提取整列分词结果，返回以原始行号为索引的词汇Series"""
+    # 使用 Arrow 字符串，切分结果为 Arrow 列表，展开时无需逐行创建 Python 对象
+    segmented = segmented_series.dropna().astype(pd.ArrowDtype(pa.string())).str.strip()
+
+    # 处理列表格式
+    is_list = segmented.str.startswith('[') & segmented.str.endswith(']')
+    list_words = (segmented[is_list].str.slice(1, -1)
+                  .str.replace(r'[\'"]', '', regex=True)
+                  .str.split(','))
+    plain_words = segmented[~is_list].str.split()
+
+    # 展开为一行一个词，保持原始行顺序
+    words = pd.concat([list_words, plain_words]).sort_index(kind='stable').explode()
+    words = words.dropna().str.strip()
+
+    # 过滤
+    return words[(words.str.len() > 0) & ~words.isin(['\\n', '\\t'])]
+
+
+def has_binary_columns(df):
+    """检查是否有被读成 bytes 的列（pyarrow 引擎遇到非 UTF-8 内容时不报错，而是把整列读成 bytes）"""
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        values = df[col].dropna()
+        if not values.empty and isinstance(values.iloc[0], bytes):
+            return True
+    return False
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_CACHED_FILES, ttl=CACHE_TTL)
+def load_df(file_key, _uploaded_file):
+    """读取并预处理评论数据（按上传文件标识缓存，各会话共享同一份只读数据，不再每次复制）"""
+    file_bytes = _uploaded_file.getvalue()
+
+    # 优先用 pyarrow 多线程解析；pyarrow 解析失败或读出 bytes 列（非 UTF-8 编码）时改用默认引擎重新解析，
+    # 两种引擎都只支持 UTF-8，非 UTF-8 文件由默认引擎给出编码错误
     try:
-        clean_str = segmented_str.strip()
-
-        # 处理列表格式
-        if clean_str.startswith('[') and clean_str.endswith(']'):
-            content = clean_str[1:-1].replace("'", "").replace('"', '')
-            words = [word.strip() for word in content.split(',')]
-        else:
-            words = clean_str.split()
-
-        # 过滤
-        filtered_words = []
-        for word in words:
-            word_clean = word.strip()
-            if (len(word_clean) > 0 and
-                    not word_clean.isspace() and
-                    word_clean not in [' ', '', '\\n', '\\t']):
-                filtered_words.append(word_clean)
-
-        return filtered_words
+        df = pd.read_csv(io.BytesIO(file_bytes), engine='pyarrow')
+    except ValueError:
+        df = None
+    if df is None or has_binary_columns(df):
+        df = pd.read_csv(io.BytesIO(file_bytes))
+
+    if 'post_time' in df.columns:
+        df['post_time'] = pd.to_datetime(df['post_time'], errors='coerce')
+        df['post_day'] = df['post_time'].dt.floor('D')
+
+    # 情感标签取值很少，转为分类类型后比较、计数都在整数编码上进行
+    if 'sentiment_label' in df.columns:
+        df['sentiment_label'] = df['sentiment_label'].astype('category')
+
+    # 同一用户往往有多条评论，用户名同样按分类类型存储以节省内存
+    if 'user_name' in df.columns:
+        df['user_name'] = df['user_name'].astype('category')
+
+    # 数值列压缩为更小的类型，减少后续筛选、排序、统计的内存读写
+    if 'like_count' in df.columns and pd.api.types.is_numeric_dtype(df['like_count']):
+        df['like_count'] = pd.to_numeric(df['like_count'], downcast='integer')
+    if 'sentiment_score' in df.columns and pd.api.types.is_numeric_dtype(df['sentiment_score']):
+        df['sentiment_score'] = pd.to_numeric(df['sentiment_score'], downcast='float')
+
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES, ttl=CACHE_TTL)
+def compute_sentiment_word_freq(file_key, _df):
+    """按情感标签分别统计词频，切换情感类型时无需重新统计"""
+    words = split_segmented_words(_df['segmented_words'])
+    label_codes = _df['sentiment_label'].cat.codes.to_numpy()[_df.index.get_indexer(words.index)]
+
+    # 词汇只做一次哈希编码，各情感类型的计数在整数编码上用 bincount 完成
+    word_codes, vocab = pd.factorize(words, sort=False)
+
+    # 没有任何词汇的情感类型也保留空词频
+    sentiment_word_freq = {label: pd.Series(dtype='int64') for label in _df['sentiment_label'].unique()}
+    categories = _df['sentiment_label'].cat.categories
+    for code in np.unique(label_codes):
+        counts = np.bincount(word_codes[label_codes == code], minlength=len(vocab))
+        present = np.flatnonzero(counts)
+        label = categories[code] if code >= 0 else np.nan
+        sentiment_word_freq[label] = pd.Series(counts[present], index=vocab[present])
+    return sentiment_word_freq
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES * 4, ttl=CACHE_TTL)
+def compute_word_freq(file_key, _df, sentiment_option):
+    """取出所选情感类型的词频（全部评论为各情感词频之和），没有对应数据时返回None"""
+    sentiment_word_freq = compute_sentiment_word_freq(file_key, _df)
+    if sentiment_option == "全部评论":
+        target_freqs = list(sentiment_word_freq.values())
+    else:
+        label = {"积极评论": '积极', "消极评论": '消极', "中性评论": '中性'}[sentiment_option]
+        target_freqs = [sentiment_word_freq[label]] if label in sentiment_word_freq else []
 
-    except Exception as e:
-        return []
+    if not target_freqs:
+        return None
+
+    # 词表不整体排序，高频词由调用方按需取前若干个
+    return pd.concat(target_freqs).groupby(level=0, sort=False).sum()
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES, ttl=CACHE_TTL)
+def compute_sentiment_counts(file_key, _df):
+    """统计各情感类型的评论数"""
+    return _df['sentiment_label'].value_counts()
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES, ttl=CACHE_TTL)
+def compute_trend_stats(file_key, _df):
+    """按天汇总平均情感得分和评论数量，天数过多时改为按周汇总，返回(统计结果, 周期名称)"""
+    period_key = _df['post_day']
+    period_label = "每日"
+    if period_key.nunique() > MAX_TREND_POINTS:
+        period_key = period_key.dt.to_period('W').dt.start_time.rename('post_day')
+        period_label = "每周"
+
+    trend_stats = _df.groupby(period_key, sort=True, observed=True).agg(
+        sentiment_score=('sentiment_score', 'mean'),    # 计算情感得分的均值
+        comment_id=('comment_id', 'size')               # 统计评论数量
+    ).reset_index()
+    return trend_stats, period_label
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES * 8, ttl=CACHE_TTL)
+def compute_filtered_positions(file_key, _df, sentiment_filter, like_range):
+    """按情感类型和点赞数范围筛选评论，返回满足条件的行位置"""
+    # 先合并所有条件为一个掩码，只做一次行选择
+    filter_mask = _df['sentiment_label'].isin(sentiment_filter).to_numpy()
+
+    if like_range is not None:
+        like_values = _df['like_count'].to_numpy()
+        filter_mask = filter_mask & (like_values >= like_range[0]) & (like_values <= like_range[1])
+
+    return np.flatnonzero(filter_mask)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES * 3, ttl=CACHE_TTL)
+def compute_sort_order(file_key, _df, sort_column):
+    """全部评论按指定列降序排列的行位置（每个文件每列只排序一次）"""
+    sort_values = _df[sort_column].reset_index(drop=True)
+    return sort_values.sort_values(ascending=False, kind='stable').index.to_numpy()
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_FILES * 8, ttl=CACHE_TTL)
+def compute_sorted_positions(file_key, _df, sentiment_filter, like_range, sort_column):
+    """返回筛选后按指定列降序排列的行位置（按筛选条件和排序方式缓存，翻页时不再重复排序）"""
+    positions = compute_filtered_positions(file_key, _df, sentiment_filter, like_range)
+    if sort_column is None:
+        return positions
+
+    # 在预排序的顺序上套用筛选条件，稳定排序保证结果与对筛选结果单独排序一致
+    order = compute_sort_order(file_key, _df, sort_column)
+    selected = np.zeros(len(order), dtype=bool)
+    selected[positions] = True
+    return order[selected[order]]
 
 
 # 设置页面
@@ -352,15 +587,16 @@ def main():
     if uploaded_file is not None:
         # 读取数据
         try:
-            df = pd.read_csv(uploaded_file)
+            # 以上传文件标识作为各缓存的键，缓存命中时无需再对整个文件内容做哈希
+            file_key = uploaded_file.file_id
+            df = load_df(file_key, uploaded_file)
             st.success(f"✅ 成功读取数据，共 {len(df)} 行")
         except Exception as e:
             st.error(f"❌ 读取数据失败: {e}")
             return
 
-        # 数据预处理
-        if 'post_time' in df.columns:
-            df['post_time'] = pd.to_datetime(df['post_time'], errors='coerce')
+        # 各情感评论数只统计一次，概览指标和饼图共用
+        sentiment_counts = compute_sentiment_counts(file_key, df)
 
         # 显示基本信息
         st.header("📊 数据概览")
@@ -380,7 +616,7 @@ def main():
             """.format(len(df)), unsafe_allow_html=True)
         
         with col2:
-            positive_count = len(df[df['sentiment_label'] == '积极'])
+            positive_count = sentiment_counts.get('积极', 0)
             st.markdown("""
             <div style="background: white; 
                         padding: 1.5rem; 
@@ -394,7 +630,7 @@ def main():
             """.format(positive_count), unsafe_allow_html=True)
         
         with col3:
-            negative_count = len(df[df['sentiment_label'] == '消极'])
+            negative_count = sentiment_counts.get('消极', 0)
             st.markdown("""
             <div style="background: white; 
                         padding: 1.5rem; 
@@ -408,7 +644,7 @@ def main():
             """.format(negative_count), unsafe_allow_html=True)
         
         with col4:
-            neutral_count = len(df[df['sentiment_label'] == '中性'])
+            neutral_count = sentiment_counts.get('中性', 0)
             st.markdown("""
             <div style="background: white; 
                         padding: 1.5rem; 
@@ -426,51 +662,26 @@ def main():
         col1, col2 = st.columns(2)
 
         with col1:
-            sentiment_counts = df['sentiment_label'].value_counts()
-            fig_pie = px.pie(
-                values=sentiment_counts.values,
-                names=sentiment_counts.index,
-                title='评论情感分布',
-                color=sentiment_counts.index,
-                color_discrete_map={'积极': '#2E8B57', '消极': '#DC143C', '中性': '#1E90FF'}
-            )
+            fig_pie = create_sentiment_pie_chart(sentiment_counts)
             st.plotly_chart(fig_pie, use_container_width=True)
 
         with col2:
             if 'sentiment_score' in df.columns:
-                fig_hist = px.histogram(
-                    df, x='sentiment_score',
-                    title='情感得分分布',
-                    nbins=20,
-                    color_discrete_sequence=['#636EFA']
-                )
-                fig_hist.add_vline(x=0.5, line_dash="dash", line_color="red")
+                fig_hist = create_score_histogram(file_key, df['sentiment_score'])
                 st.plotly_chart(fig_hist, use_container_width=True)
 
         # 时间趋势分析
         st.header("📈 评论时间趋势")
         if 'post_time' in df.columns:
-            daily_stats = df.groupby(df['post_time'].dt.date).agg({
-                'sentiment_score': 'mean',            # 计算情感得分的日均值
-                'comment_id': 'count'                  # 统计每日评论数量
-            }).reset_index()
+            trend_stats, period_label = compute_trend_stats(file_key, df)
+            fig_trend, fig_count = create_trend_charts(trend_stats, period_label)
 
             col1, col2 = st.columns(2)
 
             with col1:
-                fig_trend = px.line(
-                    daily_stats, x='post_time', y='sentiment_score',
-                    title='每日平均情感得分趋势',
-                    labels={'sentiment_score': '平均情感得分', 'post_time': '日期'}
-                )
                 st.plotly_chart(fig_trend, use_container_width=True)
 
             with col2:
-                fig_count = px.bar(
-                    daily_stats, x='post_time', y='comment_id',
-                    title='每日评论数量',
-                    labels={'comment_id': '评论数量', 'post_time': '日期'}
-                )
                 st.plotly_chart(fig_count, use_container_width=True)
 
         # 词云分析 - 使用替代方案
@@ -493,82 +704,58 @@ def main():
         # 词汇数量设置
         max_words = st.slider("显示词汇数量", 10, 50, 25, key="max_words_slider")
 
+        # 当前选项对应的可视化结果标识
+        viz_key = (file_key, sentiment_option, viz_option)
+
         # 生成图表
         if st.button("生成可视化", type="primary", key="generate_viz"):
             with st.spinner("正在生成可视化图表..."):
-                # 根据选择过滤数据
-                if sentiment_option == "全部评论":
-                    target_df = df
-                elif sentiment_option == "积极评论":
-                    target_df = df[df['sentiment_label'] == '积极']
-                elif sentiment_option == "消极评论":
-                    target_df = df[df['sentiment_label'] == '消极']
-                else:
-                    target_df = df[df['sentiment_label'] == '中性']
+                # 根据选择取出对应情感的词频
+                word_freq = compute_word_freq(file_key, df, sentiment_option)
 
-                if len(target_df) == 0:
+                if word_freq is None:
                     st.warning(f"⚠️ 没有找到 {sentiment_option} 的数据")
                     return
 
-                # 准备文本数据
-                all_words = []
-                for seg_text in target_df['segmented_words']:
-                    words = get_words_from_segmented(seg_text)
-                    all_words.extend(words)
-
-                if all_words:
-                    # 统计词频
-                    word_freq = Counter(all_words)
-
-                    # 显示统计信息
-                    st.success(f"✅ 成功提取 {len(all_words)} 个词汇，{len(word_freq)} 个不同词汇")
-
-                    # 显示前10个高频词
-                    top_10 = word_freq.most_common(10)
-                    top_words_str = "、".join([f"{word}({count})" for word, count in top_10])
-                    st.info(f"📊 前10个高频词: {top_words_str}")
-
-                    # 根据选择的方案生成图表
-                    title_suffix = f"{sentiment_option} - "
-
-                    if viz_option == "高级条形图":
-                        fig = create_advanced_bar_chart(
-                            word_freq,
-                            title=title_suffix + '高频词汇图'
-                        )
-
-                    elif viz_option == "词汇重要性图":
-                        fig = create_word_importance_chart(
-                            word_freq,
-                            title=title_suffix + '词汇重要性分布'
-                        )
-
-                    elif viz_option == "频率热力图":
-                        fig = create_word_frequency_heatmap(
-                            word_freq,
-                            title=title_suffix + '词汇频率热力图'
-                        )
-
-                    elif viz_option == "网络图":
-                        fig = create_word_network_chart(
-                            word_freq,
-                            title=title_suffix + '词汇网络图'
-                        )
-
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                        st.success("🎉 可视化生成成功！")
-                    else:
-                        st.error("❌ 可视化生成失败")
-
-                    # 显示高频词表格
-                    st.subheader("📋 高频词汇TOP20")
-                    top_words = word_freq.most_common(20)
-                    word_df = pd.DataFrame(top_words, columns=['词汇', '出现次数'])
-                    st.dataframe(word_df, use_container_width=True, height=400)
+                # 高频词只取一次（部分排序），图表（最多30个词）、前10和TOP20表格都从中切片
+                top_words = word_freq.nlargest(30)
+
+                # 根据选择的方案生成图表
+                fig = None
+                if not word_freq.empty:
+                    fig = create_word_chart(viz_option, top_words, sentiment_option)
+
+                # 保存生成结果，其他控件触发页面重新运行时直接复用
+                st.session_state['word_viz'] = (viz_key, word_freq.sum(), len(word_freq), top_words, fig)
 
+        # 显示最近一次生成的结果（选项未改变时才显示）
+        saved_viz = st.session_state.get('word_viz')
+        if saved_viz is not None and saved_viz[0] == viz_key:
+            _, total_words, unique_words, top_words, fig = saved_viz
+
+            if unique_words:
+                # 显示统计信息
+                st.success(f"✅ 成功提取 {total_words} 个词汇，{unique_words} 个不同词汇")
+
+                # 显示前10个高频词
+                top_10 = top_words.head(10)
+                top_words_str = "、".join([f"{word}({count})" for word, count in top_10.items()])
+                st.info(f"📊 前10个高频词: {top_words_str}")
+
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.success("🎉 可视化生成成功！")
                 else:
-                    st.warning("⚠️ 没有找到足够的词汇数据")
+                    st.error("❌ 可视化生成失败")
+
+                # 显示高频词表格
+                st.subheader("📋 高频词汇TOP20")
+                top_20 = top_words.head(20)
+                word_df = pd.DataFrame({'词汇': top_20.index, '出现次数': top_20.values})
+                st.dataframe(word_df, use_container_width=True, height=400)
+
+            else:
+                st.warning("⚠️ 没有找到足够的词汇数据")
 
         # 评论详情查看
         st.header("💬 评论详情浏览")
@@ -597,16 +784,12 @@ def main():
             )
 
         # 应用筛选
-        filtered_df = df[df['sentiment_label'].isin(sentiment_filter)]
-
-        if 'like_count' in df.columns:
-            filtered_df = filtered_df[
-                (filtered_df['like_count'] >= min_likes) &
-                (filtered_df['like_count'] <= max_likes)
-                ]
+        like_range = (min_likes, max_likes) if 'like_count' in df.columns else None
+        filtered_positions = compute_filtered_positions(file_key, df, sentiment_filter, like_range)
 
         # 显示筛选后的评论
-        st.subheader(f"筛选结果: {len(filtered_df)} 条评论")
+        filtered_count = len(filtered_positions)
+        st.subheader(f"筛选结果: {filtered_count} 条评论")
 
         # 排序选项
         sort_options = ["默认排序"]
@@ -619,45 +802,41 @@ def main():
 
         sort_option = st.selectbox("排序方式:", sort_options, key="sort_selector")
 
-        if sort_option == "按点赞数降序" and 'like_count' in filtered_df.columns:
-            filtered_df = filtered_df.sort_values('like_count', ascending=False)
-        elif sort_option == "按情感得分降序" and 'sentiment_score' in filtered_df.columns:
-            filtered_df = filtered_df.sort_values('sentiment_score', ascending=False)
-        elif sort_option == "按时间降序" and 'post_time' in filtered_df.columns:
-            filtered_df = filtered_df.sort_values('post_time', ascending=False)
-
         # 分页显示
         page_size = 10
-        total_pages = max(1, (len(filtered_df) // page_size) + 1)
+        total_pages = max(1, -(-filtered_count // page_size))
 
         page_number = st.number_input("页码", min_value=1, max_value=total_pages, value=1, key="page_selector")
         start_idx = (page_number - 1) * page_size
         end_idx = start_idx + page_size
 
-        # 显示评论
-        for idx, row in filtered_df.iloc[start_idx:end_idx].iterrows():
-            # 根据情感设置颜色
-            if row['sentiment_label'] == '积极':
-                color = "🟢"
-                border_color = "#2E8B57"
-            elif row['sentiment_label'] == '消极':
-                color = "🔴"
-                border_color = "#DC143C"
-            else:
-                color = "🔵"
-                border_color = "#1E90FF"
-
-            # 显示评论卡片
-            st.markdown(f"""
-            <div style="border-left: 4px solid {border_color}; padding: 10px; margin: 10px 0; background-color: #f8f9fa; border-radius: 5px;">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <strong>{color} {row['user_name'] if 'user_name' in row else '匿名用户'}</strong>
-                    <span>👍 {row['like_count'] if 'like_count' in row else 0} | 情感: {row['sentiment_score'] if 'sentiment_score' in row else 'N/A'}</span>
-                </div>
-                <p style="margin: 5px 0;">{row['content_cleaned'] if 'content_cleaned' in row else '无内容'}</p>
-                <small>时间: {row['post_time'] if 'post_time' in row else '未知'}</small>
-            </div>
-            """, unsafe_allow_html=True)
+        sort_columns = {"按点赞数降序": 'like_count', "按情感得分降序": 'sentiment_score', "按时间降序": 'post_time'}
+        sorted_positions = compute_sorted_positions(file_key, df, sentiment_filter, like_range,
+                                                    sort_columns.get(sort_option))
+
+        # 显示评论：当前页整体以表格形式一次性渲染，而不是逐条拼接HTML
+        page_df = df.iloc[sorted_positions[start_idx:end_idx]]
+        display_columns = [col for col in ['sentiment_label', 'user_name', 'like_count', 'sentiment_score',
+                                           'content_cleaned', 'post_time'] if col in page_df.columns]
+        view = page_df[display_columns].copy()
+
+        # 根据情感设置颜色
+        sentiment_icons = {'积极': "🟢", '消极': "🔴"}
+        view['sentiment_label'] = [f"{sentiment_icons.get(label, '🔵')} {label}" for label in view['sentiment_label']]
+
+        st.dataframe(
+            view,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'sentiment_label': "情感",
+                'user_name': "用户",
+                'like_count': st.column_config.NumberColumn("点赞数", format="👍 %d"),
+                'sentiment_score': st.column_config.ProgressColumn("情感得分", min_value=0, max_value=1, format="%.2f"),
+                'content_cleaned': st.column_config.TextColumn("评论内容", width="large"),
+                'post_time': st.column_config.DatetimeColumn("时间"),
+            }
+        )
 
     else:
         # 没有上传文件时的展示